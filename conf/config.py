@@ -1,4 +1,5 @@
 import os
+import sqlite3
 from dotenv import load_dotenv
 from mysql.connector import pooling, Error
 from conf.log_config import logger
@@ -11,6 +12,7 @@ class Config:
     MYSQL_USER = os.getenv('MYSQL_USER')
     MYSQL_PASS = os.getenv('MYSQL_PASS')
     MYSQL_DB = os.getenv('MYSQL_DB')
+    MYSQL_POOL_SIZE = int(os.getenv('MYSQL_POOL_SIZE', 5))
 
     @classmethod
     def validate(cls):
@@ -21,38 +23,44 @@ class Config:
 
 
 class MySqlConnectionPool:
+    dialect = 'mysql'
     _instance = None
     _pool = None
 
-    def __new__(cls):
+    def __new__(cls, *args, **kwargs):
         if cls._instance is None:
             cls._instance = super(MySqlConnectionPool, cls).__new__(cls)
         return cls._instance
 
-    def __init__(self):
-        if self._pool is None:
-            try:
-                Config.validate()
-                
-                self._pool = pooling.MySQLConnectionPool(
-                    pool_name='mypool',
-                    pool_size=5,
-                    pool_reset_session=True,
-                    host=Config.MYSQL_HOST,
-                    port=Config.MYSQL_PORT,
-                    user=Config.MYSQL_USER,
-                    password=Config.MYSQL_PASS,
-                    database=Config.MYSQL_DB,
-                    charset='utf8mb4',
-                    collation='utf8mb4_general_ci'
-                )
-                logger.info("MySQL connection pool created successfully")
-            except Error as e:
-                logger.error(f'Error while connecting to MySQL using connection pool: {e}')
-                raise
-            except ValueError as e:
-                logger.error(str(e))
-                raise
+    def __init__(self, pool_size: int = None):
+        if self._pool is not None:
+            if pool_size and pool_size != self._pool.pool_size:
+                logger.warning(f"MySQL connection pool already created with pool_size={self._pool.pool_size}, "
+                               f"ignoring pool_size={pool_size}")
+            return
+        
+        try:
+            Config.validate()
+            
+            self._pool = pooling.MySQLConnectionPool(
+                pool_name='mypool',
+                pool_size=pool_size or Config.MYSQL_POOL_SIZE,
+                pool_reset_session=True,
+                host=Config.MYSQL_HOST,
+                port=Config.MYSQL_PORT,
+                user=Config.MYSQL_USER,
+                password=Config.MYSQL_PASS,
+                database=Config.MYSQL_DB,
+                charset='utf8mb4',
+                collation='utf8mb4_general_ci'
+            )
+            logger.info("MySQL connection pool created successfully")
+        except Error as e:
+            logger.error(f'Error while connecting to MySQL using connection pool: {e}')
+            raise
+        except ValueError as e:
+            logger.error(str(e))
+            raise
 
     def get_connection(self):
         """Get a connection from the pool."""
@@ -65,6 +73,18 @@ class MySqlConnectionPool:
             raise
 
 
+class SQLiteConnectionPool:
+    """SQLite stand-in exposing the MySqlConnectionPool interface, for local runs and tests"""
+    dialect = 'sqlite'
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def get_connection(self):
+        """Open a new connection to the database file."""
+        return sqlite3.connect(self.db_path, timeout=30)
+
+
 class DBAccess:
     def __init__(self):
         self._pool = MySqlConnectionPool()
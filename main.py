@@ -1,10 +1,145 @@
 import os
+import time
+import queue
+import argparse
+import threading
 import pandas as pd
 from tqdm import tqdm
-from conf.config import DBAccess
-from utils.utils import DataProcessor, FFmpegCommandGenerator, VMAFCalculator
+from concurrent.futures import ThreadPoolExecutor
+from conf.config import DBAccess, MySqlConnectionPool
+from conf.log_config import logger
+from utils.utils import (DataProcessor, DatasetStore, EncodeCostModel, FFmpegCommandGenerator,
+                         JobScheduler, ResultsSink, VideoAnalyzer, VMAFCalculator)
+
+def collect_jobs(db: DBAccess, codecs: list, source_video_dir: str, encoded_video_dir: str) -> list:
+   """Build one job per source video, codec, profile and bitrate"""
+   # Load profile commands once, they do not depend on the source video
+   command_rows = []
+   for codec in codecs:
+       codec_name = codec['master_name']
+       profiles = db.get_available_profile_names(codec_name)
+       
+       for profile in profiles:
+           profile_name = profile['name']
+           profile_details = db.get_profile_detail(codec_name, profile_name)
+           
+           if profile_details:
+               profile_data = pd.DataFrame(profile_details)
+               command_data = FFmpegCommandGenerator.generate_ffmpeg_commands_df(profile_data)
+               command_rows.extend(row for _, row in command_data.iterrows())
+   
+   jobs = []
+   for genre in os.listdir(source_video_dir):
+       genre_path = os.path.join(source_video_dir, genre)
+       
+       if not os.path.isdir(genre_path):
+           continue
+       
+       videos = [f for f in os.listdir(genre_path)
+                if f.endswith(('.mp4', '.mkv', '.avi', '.mov'))]
+       
+       for video_file in videos:
+           input_video = os.path.join(genre_path, video_file)
+           source_info = VideoAnalyzer.get_source_video_info(input_video, genre)
+           
+           for row in command_rows:
+               output_name = f"{os.path.splitext(video_file)[0]}_encoded_{row['codec'].replace(' ', '_')}_{row['profile']}_{row['bitrate']}k.yuv"
+               
+               # Job description in dataset columns, used for cost prediction
+               features = dict(source_info)
+               features.update(VideoAnalyzer.parse_ffmpeg_command(row['ffmpeg_cmd']))
+               
+               jobs.append({
+                   'genre': genre,
+                   'video_file': video_file,
+                   'input_video': input_video,
+                   'codec': row['codec'],
+                   'profile': row['profile'],
+                   'bitrate': row['bitrate'],
+                   'ffmpeg_cmd': row['ffmpeg_cmd'],
+                   'output_name': output_name,
+                   'output_video': os.path.join(encoded_video_dir, genre, output_name),
+                   'features': DatasetStore.typed_row(features)
+               })
+   
+   return jobs
+
+def print_schedule(queues: list):
+   summary = JobScheduler.summarize(queues)
+   
+   print(f"\nPredicted makespan: {summary['makespan']:.1f}s on {len(queues)} worker(s)")
+   print(f"Predicted encode time: {summary['stages']['j_encode_time']:.1f}s")
+   print(f"Predicted quality time: {summary['stages']['j_quality_time']:.1f}s")
+   
+   for index, (worker_jobs, load) in enumerate(zip(queues, summary['workers'])):
+       print(f"\nWorker {index}: {len(worker_jobs)} jobs, "
+             f"encode {load['j_encode_time']:.1f}s, quality {load['j_quality_time']:.1f}s")
+       for job in worker_jobs:
+           print(f"  {job['genre']}/{job['video_file']} {job['codec']} - {job['profile']} - {job['bitrate']}k: "
+                 f"encode {job['predicted']['j_encode_time']:.1f}s, quality {job['predicted']['j_quality_time']:.1f}s")
+
+def run_job(job: dict, log_path: str, store: DatasetStore, results_sink: ResultsSink, write_lock: threading.Lock):
+   genre = job['genre']
+   input_video = job['input_video']
+   output_video = job['output_video']
+   profile_desc = f"{job['codec']} - {job['profile']} - {job['bitrate']}k"
+   print(f"\nEncoding {genre}/{job['video_file']} {profile_desc}")
+   
+   ffmpeg_command = FFmpegCommandGenerator.build_ffmpeg_command(
+       input_file=input_video,
+       encode_params=job['ffmpeg_cmd'],
+       codec=job['codec'],
+       profile=job['profile'],
+       bitrate=str(job['bitrate']),
+       genre_folder=genre
+   )
+   
+   encode_start = time.time()
+   if not FFmpegCommandGenerator.execute_ffmpeg_command(ffmpeg_command):
+       print(f"Failed to encode {profile_desc}")
+       return
+   encode_time = time.time() - encode_start
+   print(f"Successfully encoded {profile_desc}")
+   
+   # Calculate VMAF, PSNR, SSIM and MS-SSIM in one pass
+   quality_start = time.time()
+   metrics = VMAFCalculator.calculate_quality_metrics(
+       source_path=input_video,
+       encoded_path=output_video
+   )
+   quality_time = time.time() - quality_start
+   vmaf_score = metrics['t_vmaf']
+   
+   # Create log entry
+   log_entry = FFmpegCommandGenerator.create_encoding_log(
+       input_video=input_video,
+       output_video=output_video,
+       ffmpeg_command=ffmpeg_command,
+       genre_folder=genre
+   )
+   
+   if log_entry:
+       # Add quality metrics and stage timings to log entry
+       for metric, value in metrics.items():
+           log_entry[metric] = str(value) if value is not None else '-'
+       log_entry['j_encode_time'] = str(encode_time)
+       log_entry['j_quality_time'] = str(quality_time)
+       
+       # Save to dataset.csv and dataset store
+       with write_lock:
+           DataProcessor.save_profiles_to_csv([log_entry], log_path, mode='a')
+           store.ingest([log_entry])
+       if results_sink:
+           results_sink.submit(os.path.join(genre, job['output_name']), log_entry)
+   
+   print(f"VMAF Score: {vmaf_score if vmaf_score is not None else 'N/A'}")
 
 def main():
+   parser = argparse.ArgumentParser(description="Encode source videos with every profile and collect quality metrics")
+   parser.add_argument('--workers', type=int, default=1, help="Number of encode jobs run in parallel")
+   parser.add_argument('--dry-run', action='store_true', help="Print the predicted schedule without encoding")
+   args = parser.parse_args()
+   
    db = DBAccess()
    
    # Get all available codecs
@@ -20,101 +155,68 @@ def main():
    os.makedirs(data_dir, exist_ok=True)
    os.makedirs(encoded_video_dir, exist_ok=True)
    
-   # Count total number of encodes
-   total_encodes = 0
-   for codec in codecs:
-       codec_name = codec['master_name']
-       profiles = db.get_available_profile_names(codec_name)
-       total_encodes += len(profiles) * sum(
-           len([f for f in os.listdir(os.path.join(source_video_dir, genre))
-                if f.endswith(('.mp4', '.mkv', '.avi', '.mov'))])
-           for genre in os.listdir(source_video_dir)
-           if os.path.isdir(os.path.join(source_video_dir, genre))
-       )
-
-   # Create progress bar
-   with tqdm(total=total_encodes, desc="Total Progress") as pbar:
-       # Process each video genre
-       for genre in os.listdir(source_video_dir):
-           genre_path = os.path.join(source_video_dir, genre)
-           
-           if not os.path.isdir(genre_path):
-               continue
-               
-           print(f"\nProcessing genre: {genre}")
-           
-           # Process each video in genre
-           videos = [f for f in os.listdir(genre_path) 
-                    if f.endswith(('.mp4', '.mkv', '.avi', '.mov'))]
-           
-           for video_file in videos:
-               input_video = os.path.join(genre_path, video_file)
-               print(f"\nProcessing video: {video_file}")
+   # Open indexed dataset store, migrate existing dataset.csv on first run
+   log_path = os.path.join(data_dir, 'dataset.csv')
+   store_path = os.path.join(data_dir, 'dataset.db')
+   if not os.path.exists(store_path) and os.path.exists(log_path):
+       store = DatasetStore.from_csv(log_path, store_path)
+   else:
+       store = DatasetStore(store_path)
+   
+   # Predict job run times from previous runs
+   jobs = collect_jobs(db, codecs, source_video_dir, encoded_video_dir)
+   cost_model = EncodeCostModel.from_store(store)
+   for job in jobs:
+       job['predicted'] = cost_model.predict(job['features'])
+   
+   if args.dry_run:
+       print_schedule(JobScheduler.schedule(jobs, args.workers))
+       store.close()
+       return
+   
+   # Write results back to MySQL in batches from a background thread
+   results_sink = ResultsSink(MySqlConnectionPool())
+   if not results_sink.create_table():
+       logger.error("Could not create MySQL results table, skipping write-back")
+       print("Could not create MySQL results table, results are only saved locally")
+       results_sink.close()
+       results_sink = None
+   write_lock = threading.Lock()
+   
+   # Free workers pull the longest remaining job, so mispredictions do not leave workers idle
+   pending = queue.Queue()
+   for job in JobScheduler.order(jobs):
+       pending.put(job)
+   
+   with tqdm(total=len(jobs), desc="Total Progress") as pbar:
+       def run_worker():
+           while True:
+               try:
+                   job = pending.get_nowait()
+               except queue.Empty:
+                   return
                
-               # Process each codec
-               for codec in codecs:
-                   codec_name = codec['master_name']
-                   profiles = db.get_available_profile_names(codec_name)
-                   
-                   # Process each profile
-                   for profile in profiles:
-                       profile_name = profile['name']
-                       profile_details = db.get_profile_detail(codec_name, profile_name)
-                       
-                       if profile_details:
-                           profile_data = pd.DataFrame(profile_details)
-                           command_data = FFmpegCommandGenerator.generate_ffmpeg_commands_df(profile_data)
-                           
-                           if not command_data.empty:
-                               for _, row in command_data.iterrows():
-                                   profile_desc = f"{row['codec']} - {row['profile']} - {row['bitrate']}k"
-                                   print(f"\nEncoding {profile_desc}")
-                                   
-                                   output_name = f"{os.path.splitext(video_file)[0]}_encoded_{row['codec'].replace(' ', '_')}_{row['profile']}_{row['bitrate']}k.yuv"
-                                   output_video = os.path.join(encoded_video_dir, genre, output_name)
-                                   
-                                   ffmpeg_command = FFmpegCommandGenerator.build_ffmpeg_command(
-                                       input_file=input_video,
-                                       encode_params=row['ffmpeg_cmd'],
-                                       codec=row['codec'],
-                                       profile=row['profile'],
-                                       bitrate=str(row['bitrate']),
-                                       genre_folder=genre
-                                   )
-                                   
-                                   if FFmpegCommandGenerator.execute_ffmpeg_command(ffmpeg_command):
-                                       print(f"Successfully encoded {profile_desc}")
-                                       
-                                       # Calculate VMAF score
-                                       vmaf_score = VMAFCalculator.calculate_vmaf(
-                                           source_path=input_video,
-                                           encoded_path=output_video
-                                       )
-                                       
-                                       # Create log entry
-                                       log_entry = FFmpegCommandGenerator.create_encoding_log(
-                                           input_video=input_video,
-                                           output_video=output_video,
-                                           ffmpeg_command=ffmpeg_command,
-                                           genre_folder=genre
-                                       )
-                                       
-                                       if log_entry:
-                                           # Add VMAF score to log entry
-                                           log_entry['t_vmaf'] = str(vmaf_score) if vmaf_score is not None else '-'
-                                           
-                                           # Save to dataset.csv
-                                           log_path = os.path.join(data_dir, 'dataset.csv')
-                                           DataProcessor.save_profiles_to_csv([log_entry], log_path, mode='a')
-                                           
-                                       print(f"VMAF Score: {vmaf_score if vmaf_score is not None else 'N/A'}")
-                                   else:
-                                       print(f"Failed to encode {profile_desc}")
-                                       
-                                   pbar.update(1)
-                                   pbar.set_postfix({'Current': f"{genre}/{video_file}/{profile_desc}"})
+               job_desc = f"{job['genre']}/{job['video_file']}/{job['codec']} - {job['profile']} - {job['bitrate']}k"
+               try:
+                   run_job(job, log_path, store, results_sink, write_lock)
+               except Exception as e:
+                   logger.error(f"Error processing {job_desc}: {e}")
+                   print(f"Failed to process {job_desc}: {e}")
+               pbar.update(1)
+               pbar.set_postfix({'Current': job_desc})
+       
+       try:
+           workers = max(args.workers, 1)
+           with ThreadPoolExecutor(max_workers=workers) as executor:
+               for future in [executor.submit(run_worker) for _ in range(workers)]:
+                   future.result()
+       finally:
+           # Always drain queued MySQL rows, the sink thread is a daemon
+           store.close()
+           if results_sink:
+               results_sink.close()
 
    print("\nEncoding process completed!")
 
 if __name__ == "__main__":
-   main()
\ No newline at end of file
+   main()
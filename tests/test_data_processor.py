@@ -0,0 +1,26 @@
+import pandas as pd
+from utils.utils import DataProcessor
+
+
+def test_append_extends_old_header_with_new_columns(tmp_path):
+    csv_path = tmp_path / 'dataset.csv'
+    pd.DataFrame([{'s_name': 'a.mp4', 't_vmaf': '80.1'}]).to_csv(csv_path, index=False)
+
+    assert DataProcessor.save_profiles_to_csv([{'s_name': 'b.mp4', 't_vmaf': '90.2', 't_psnr': '40.0'}], str(csv_path))
+
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    assert list(df.columns) == ['s_name', 't_vmaf', 't_psnr']
+    assert df.to_dict('records') == [
+        {'s_name': 'a.mp4', 't_vmaf': '80.1', 't_psnr': '-'},
+        {'s_name': 'b.mp4', 't_vmaf': '90.2', 't_psnr': '40.0'}
+    ]
+
+
+def test_append_aligns_rows_to_existing_header(tmp_path):
+    csv_path = tmp_path / 'dataset.csv'
+    pd.DataFrame([{'s_name': 'a.mp4', 't_vmaf': '80.1', 't_psnr': '38.0'}]).to_csv(csv_path, index=False)
+
+    DataProcessor.save_profiles_to_csv([{'t_vmaf': '90.2', 's_name': 'b.mp4'}], str(csv_path))
+
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    assert df.to_dict('records')[1] == {'s_name': 'b.mp4', 't_vmaf': '90.2', 't_psnr': '-'}
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+from utils.utils import DatasetStore
+
+
+def test_convert_value_types_dataset_strings():
+    assert DatasetStore._convert_value('e_bitrate', '2000k') == 2000
+    assert DatasetStore._convert_value('e_max_bitrate', '3000K') == 3000
+    assert DatasetStore._convert_value('e_framerate', '30000/1001') == 30000 / 1001
+    assert DatasetStore._convert_value('t_vmaf', '93.5') == 93.5
+    assert DatasetStore._convert_value('e_bitrate', '-') is None
+    assert DatasetStore._convert_value('e_codec_profile', '-') is None
+    assert DatasetStore._convert_value('s_scan_type', '') is None
+    assert DatasetStore._convert_value('e_codec_profile', 'main') == 'main'
+
+
+def test_convex_hull_keeps_upper_hull_of_pareto_front():
+    store = DatasetStore(':memory:')
+    points = [(100, 50), (200, 70), (300, 72), (400, 80), (500, 79), (600, 88), (600, 85)]
+    store.ingest([{'s_name': 'a.mp4', 'e_bitrate': f'{bitrate}k', 't_vmaf': str(vmaf)}
+                  for bitrate, vmaf in points])
+
+    hull = store.convex_hull('a.mp4')
+
+    # (300, 72) lies below the chord from (200, 70) to (400, 80), (500, 79) is dominated
+    assert [(row['e_bitrate'], row['t_vmaf']) for row in hull] == [(100, 50), (200, 70), (400, 80), (600, 88)]
+
+
+def test_best_rung_skips_rows_without_bitrate():
+    store = DatasetStore(':memory:')
+    store.ingest([
+        {'s_name': 'a.mp4', 'e_height': '720', 'e_bitrate': '-', 't_vmaf': '95'},
+        {'s_name': 'a.mp4', 'e_height': '720', 'e_bitrate': '2000k', 't_vmaf': '92'},
+        {'s_name': 'a.mp4', 'e_height': '720', 'e_bitrate': '1000k', 't_vmaf': '85'}
+    ])
+
+    assert store.best_rung('a.mp4', 720, 90)['e_bitrate'] == 2000
+    assert store.best_rung('a.mp4', 720, 99) is None
+
+
+def test_from_csv_migrates_rows(tmp_path):
+    csv_path = tmp_path / 'dataset.csv'
+    pd.DataFrame([
+        {'s_name': 'a.mp4', 'e_height': '720', 'e_codec_profile': '-', 'e_bitrate': '1400k', 't_vmaf': '88.1'},
+        {'s_name': 'b.mp4', 'e_height': '360', 'e_codec_profile': 'main', 'e_bitrate': '-', 't_vmaf': '-'}
+    ]).to_csv(csv_path, index=False)
+
+    store = DatasetStore.from_csv(str(csv_path), str(tmp_path / 'dataset.db'), chunk_size=1)
+
+    assert store.count() == 2
+    row = store.lookup(source='a.mp4')[0]
+    assert (row['e_height'], row['e_bitrate'], row['t_vmaf'], row['e_codec_profile']) == (720, 1400, 88.1, None)
+
+
+def test_interrupted_from_csv_leaves_no_store(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'dataset.csv'
+    db_path = tmp_path / 'dataset.db'
+    pd.DataFrame([{'s_name': f'{index}.mp4'} for index in range(4)]).to_csv(csv_path, index=False)
+
+    def interrupted_ingest(self, rows):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(DatasetStore, 'ingest', interrupted_ingest)
+    with pytest.raises(KeyboardInterrupt):
+        DatasetStore.from_csv(str(csv_path), str(db_path), chunk_size=2)
+    assert not db_path.exists()
+
+    monkeypatch.undo()
+    store = DatasetStore.from_csv(str(csv_path), str(db_path), chunk_size=2)
+    assert store.count() == 4
+    assert not any('migrating' in path.name for path in tmp_path.iterdir())
@@ -0,0 +1,56 @@
+import json
+import subprocess
+from utils.utils import VMAFCalculator
+
+
+def _fake_ffmpeg(monkeypatch, pooled_metrics: dict, returncode: int = 0):
+    """Replace ffmpeg with a stub writing pooled_metrics to the libvmaf JSON log"""
+    calls = []
+
+    def run(cmd, **kwargs):
+        filter_complex = cmd[cmd.index('-filter_complex') + 1]
+        calls.append(filter_complex)
+        log_path = filter_complex.split('log_path=')[1].split(':')[0]
+        with open(log_path, 'w') as f:
+            json.dump({'pooled_metrics': pooled_metrics}, f)
+        return subprocess.CompletedProcess(cmd, returncode, stdout='', stderr='')
+
+    monkeypatch.setattr(VMAFCalculator, 'get_video_resolution', staticmethod(lambda path: (1920, 1080)))
+    monkeypatch.setattr(subprocess, 'run', run)
+    return calls
+
+
+def test_quality_metrics_map_pooled_features_to_columns(monkeypatch):
+    calls = _fake_ffmpeg(monkeypatch, {
+        'vmaf': {'mean': 93.2},
+        'psnr_y': {'mean': 41.5},
+        'float_ssim': {'mean': 0.981},
+        'float_ms_ssim': {'mean': 0.975}
+    })
+
+    metrics = VMAFCalculator.calculate_quality_metrics('source.mp4', 'encoded.yuv')
+
+    assert metrics == {'t_vmaf': 93.2, 't_psnr': 41.5, 't_ssim': 0.981, 't_ms_ssim': 0.975}
+    assert 'feature=name=psnr|name=float_ssim|name=float_ms_ssim' in calls[0]
+
+
+def test_quality_metrics_missing_feature_is_none(monkeypatch):
+    _fake_ffmpeg(monkeypatch, {'vmaf': {'mean': 80.0}, 'psnr_y': {'mean': 35.0}, 'float_ssim': {'mean': 0.95}})
+
+    metrics = VMAFCalculator.calculate_quality_metrics('source.mp4', 'encoded.yuv')
+
+    assert metrics['t_ms_ssim'] is None
+    assert metrics['t_vmaf'] == 80.0
+
+
+def test_quality_metrics_failed_ffmpeg_returns_none(monkeypatch):
+    _fake_ffmpeg(monkeypatch, {'vmaf': {'mean': 80.0}}, returncode=1)
+
+    assert set(VMAFCalculator.calculate_quality_metrics('source.mp4', 'encoded.yuv').values()) == {None}
+
+
+def test_calculate_vmaf_skips_extra_features(monkeypatch):
+    calls = _fake_ffmpeg(monkeypatch, {'vmaf': {'mean': 88.8}})
+
+    assert VMAFCalculator.calculate_vmaf('source.mp4', 'encoded.yuv') == 88.8
+    assert 'feature=' not in calls[0]
@@ -0,0 +1,53 @@
+import time
+import sqlite3
+from conf.config import SQLiteConnectionPool
+from utils.utils import ResultsSink
+
+
+def test_upsert_overwrites_repeated_job_id(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    sink = ResultsSink(SQLiteConnectionPool(db_path), batch_size=2, flush_interval=0.05)
+    assert sink.create_table()
+
+    sink.submit('genre/a_720p.yuv', {'s_name': 'a.mp4', 'e_bitrate': '2000k', 't_vmaf': '90.0'})
+    sink.submit('genre/b_720p.yuv', {'s_name': 'b.mp4', 'e_bitrate': '2000k', 't_vmaf': '80.0'})
+    sink.flush()
+    sink.submit('genre/a_720p.yuv', {'s_name': 'a.mp4', 'e_bitrate': '2000k', 't_vmaf': '91.5'})
+    sink.close()
+
+    rows = sqlite3.connect(db_path).execute(
+        'SELECT job_id, e_bitrate, t_vmaf FROM encode_results ORDER BY job_id').fetchall()
+    assert rows == [('genre/a_720p.yuv', 2000, 91.5), ('genre/b_720p.yuv', 2000, 80.0)]
+    assert sink.failed_rows == 0
+
+
+def test_failed_batch_only_drops_bad_rows(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    connection = sqlite3.connect(db_path)
+    connection.execute('CREATE TABLE encode_results (job_id TEXT PRIMARY KEY, t_vmaf REAL CHECK (t_vmaf <= 100))')
+    connection.close()
+
+    sink = ResultsSink(SQLiteConnectionPool(db_path), flush_interval=0.05, backoff=0.01)
+    assert sink.create_table()
+    for index, vmaf in enumerate(['90', '150', '80']):
+        sink.submit(f'job_{index}', {'t_vmaf': vmaf})
+    sink.close()
+
+    rows = sqlite3.connect(db_path).execute('SELECT job_id FROM encode_results ORDER BY job_id').fetchall()
+    assert rows == [('job_0',), ('job_2',)]
+    assert sink.failed_rows == 1
+
+
+def test_batch_is_written_within_flush_interval_of_first_row(tmp_path):
+    db_path = str(tmp_path / 'results.db')
+    sink = ResultsSink(SQLiteConnectionPool(db_path), batch_size=100, flush_interval=0.5)
+    assert sink.create_table()
+
+    # Rows arriving just under flush_interval apart must not keep the batch open
+    for index in range(4):
+        sink.submit(f'job_{index}', {'t_vmaf': '90'})
+        time.sleep(0.3)
+    written = sqlite3.connect(db_path).execute('SELECT COUNT(*) FROM encode_results').fetchone()[0]
+    sink.close()
+
+    assert written >= 2
@@ -0,0 +1,92 @@
+import pytest
+from utils.utils import EncodeCostModel, JobScheduler
+
+JOB = {'s_width': 1920, 's_height': 1080, 's_duration': 10.0, 'e_width': 3840, 'e_height': 2160,
+       'e_codec': 'h265', 'e_preset': 'medium', 'e_bitrate': 12000}
+
+
+def _history(count: int, codecs=('h264', 'h265'), encode_time=None, quality_time=None) -> list:
+    """Timed runs where encoding costs 0.03 (h264) or 0.15 (h265) seconds per megapixel-second"""
+    rows = []
+    for index in range(count):
+        codec = codecs[index % len(codecs)]
+        height = (360, 720, 1080)[index % 3]
+        duration = 5.0 + index
+        mpix_seconds = height * 16 // 9 * height / 1e6 * duration
+        rows.append({
+            's_width': 1920, 's_height': 1080, 's_duration': duration,
+            'e_width': height * 16 // 9, 'e_height': height,
+            'e_codec': codec, 'e_preset': 'fast' if index % 4 == 3 else 'medium',
+            'e_bitrate': 500 + 250 * (index % 7),
+            'j_encode_time': encode_time if encode_time is not None
+            else mpix_seconds * (0.03 if codec == 'h264' else 0.15) + 1.0,
+            'j_quality_time': quality_time if quality_time is not None
+            else 1920 * 1080 / 1e6 * duration * 0.02 + 0.5
+        })
+    return rows
+
+
+def _heuristic(row: dict) -> dict:
+    mpix_seconds = row['e_width'] * row['e_height'] / 1e6 * row['s_duration']
+    source_mpix_seconds = row['s_width'] * row['s_height'] / 1e6 * row['s_duration']
+    return {
+        'j_encode_time': mpix_seconds * 0.05 * EncodeCostModel.DEFAULT_CODEC_FACTOR.get(row['e_codec'], 1.0),
+        'j_quality_time': source_mpix_seconds * 0.02
+    }
+
+
+def _job(predicted: float, quality: float = 0.0) -> dict:
+    return {'predicted': {'j_encode_time': predicted, 'j_quality_time': quality}}
+
+
+def test_predict_without_history_uses_heuristic():
+    predicted = EncodeCostModel().fit([]).predict(JOB)
+
+    assert predicted == pytest.approx(_heuristic(JOB))
+    assert predicted['j_encode_time'] == pytest.approx(4 * EncodeCostModel().predict({**JOB, 'e_codec': 'h264'})['j_encode_time'])
+
+
+def test_fitted_model_separates_codecs():
+    model = EncodeCostModel().fit(_history(60))
+
+    assert model.predict(JOB)['j_encode_time'] == pytest.approx(3840 * 2160 / 1e6 * 10 * 0.15 + 1.0)
+    assert model.predict({**JOB, 'e_codec': 'h264'})['j_encode_time'] == pytest.approx(3840 * 2160 / 1e6 * 10 * 0.03 + 1.0)
+
+
+def test_codec_missing_from_history_uses_heuristic():
+    model = EncodeCostModel().fit(_history(60, codecs=('h264',)))
+
+    assert model.predict(JOB) == pytest.approx(_heuristic(JOB))
+
+
+def test_non_positive_prediction_uses_heuristic():
+    model = EncodeCostModel().fit(_history(60, encode_time=-1.0, quality_time=5.0))
+
+    predicted = model.predict(JOB)
+    assert predicted['j_encode_time'] == pytest.approx(_heuristic(JOB)['j_encode_time'])
+    assert predicted['j_quality_time'] == pytest.approx(5.0)
+
+
+def test_too_few_runs_are_not_fitted():
+    assert EncodeCostModel().fit(_history(9)).predict(JOB) == pytest.approx(_heuristic(JOB))
+
+
+def test_schedule_places_longest_jobs_on_least_loaded_worker():
+    jobs = [_job(t) for t in (2, 7, 3, 5, 4, 6, 3)]
+
+    queues = JobScheduler.schedule(jobs, 2)
+
+    assert [[job['predicted']['j_encode_time'] for job in queue] for queue in queues] == [[7, 4, 3, 2], [6, 5, 3]]
+    assert JobScheduler.summarize(queues)['makespan'] == 16
+    assert [job['predicted']['j_encode_time'] for job in JobScheduler.order(jobs)] == [7, 6, 5, 4, 3, 3, 2]
+
+
+def test_summarize_totals_stages_per_worker():
+    queues = [[_job(4, 1), _job(2, 0.5)], [_job(3, 2)], []]
+
+    summary = JobScheduler.summarize(queues)
+
+    assert summary['stages'] == {'j_encode_time': 9, 'j_quality_time': 3.5}
+    assert summary['workers'][0] == {'j_encode_time': 6, 'j_quality_time': 1.5}
+    assert summary['workers'][2] == {'j_encode_time': 0, 'j_quality_time': 0}
+    assert summary['makespan'] == 7.5
@@ -2,9 +2,15 @@ import os
 import ast
 import time
 import json
+import heapq
+import queue
+import sqlite3
+import threading
+import tempfile
 import subprocess
+import numpy as np
 import pandas as pd
-from typing import List, Dict
+from typing import List, Dict, Optional
 from conf.log_config import logger
 
 class DataProcessor:
@@ -28,7 +34,19 @@ class DataProcessor:
             
             # Check if file exists and mode is append
             if mode == 'a' and os.path.exists(output_path):
-                df.to_csv(output_path, mode='a', header=False, index=False, encoding='utf-8')
+                existing_columns = list(pd.read_csv(output_path, nrows=0).columns)
+                new_columns = [c for c in df.columns if c not in existing_columns]
+                
+                if new_columns:
+                    # Older dataset without the new metric columns, rewrite it with the extended header
+                    existing_df = pd.read_csv(output_path, dtype=str, keep_default_na=False)
+                    for column in new_columns:
+                        existing_df[column] = '-'
+                    df = df.reindex(columns=existing_df.columns, fill_value='-')
+                    pd.concat([existing_df, df], ignore_index=True).to_csv(output_path, index=False, encoding='utf-8')
+                else:
+                    df = df.reindex(columns=existing_columns, fill_value='-')
+                    df.to_csv(output_path, mode='a', header=False, index=False, encoding='utf-8')
             else:
                 # If file doesn't exist or mode is write, create new file
                 df.to_csv(output_path, index=False, encoding='utf-8')
@@ -39,6 +57,603 @@ class DataProcessor:
             logger.error(f"Error saving to CSV: {e}")
             return False
             
+class DatasetStore:
+    """Indexed SQLite store of dataset rows with typed columns"""
+    
+    # Column name -> SQLite type, in dataset.csv order
+    COLUMNS = {
+        's_name': 'TEXT',
+        's_width': 'INTEGER',
+        's_height': 'INTEGER',
+        's_size': 'INTEGER',
+        's_duration': 'REAL',
+        's_scan_type': 'TEXT',
+        's_content_type': 'TEXT',
+        'e_width': 'INTEGER',
+        'e_height': 'INTEGER',
+        'e_aspect_ratio': 'TEXT',
+        'e_pixel_aspect_ratio': 'TEXT',
+        'e_codec': 'TEXT',
+        'e_codec_profile': 'TEXT',
+        'e_codec_level': 'TEXT',
+        'e_preset': 'TEXT',
+        'e_framerate': 'REAL',
+        'e_gop_size': 'INTEGER',
+        'e_b_frame_int': 'INTEGER',
+        'e_scan_type': 'TEXT',
+        'e_bit_depth': 'INTEGER',
+        'e_pixel_fmt': 'TEXT',
+        'e_bitrate': 'INTEGER',
+        'e_max_bitrate': 'INTEGER',
+        'e_buffer_size': 'INTEGER',
+        'e_size': 'INTEGER',
+        'e_duration': 'REAL',
+        't_vmaf': 'REAL',
+        't_psnr': 'REAL',
+        't_ssim': 'REAL',
+        't_ms_ssim': 'REAL',
+        'j_encode_time': 'REAL',
+        'j_quality_time': 'REAL'
+    }
+    
+    INDEXES = {
+        'idx_codec': ['e_codec'],
+        'idx_profile': ['e_codec_profile'],
+        'idx_resolution': ['e_height'],
+        'idx_bitrate': ['e_bitrate'],
+        # Also serves source-only lookups through its leading column
+        'idx_lookup': ['s_name', 'e_height', 'e_bitrate']
+    }
+    
+    METRICS = ('t_vmaf', 't_psnr', 't_ssim', 't_ms_ssim')
+    
+    # Values written as "<n>k" in dataset.csv, stored as kbps
+    _KBPS_COLUMNS = ('e_bitrate', 'e_max_bitrate', 'e_buffer_size')
+    
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        # Shared by encode workers, callers serialize writes
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+    
+    def _create_schema(self):
+        columns = ', '.join(f"{name} {sql_type}" for name, sql_type in self.COLUMNS.items())
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS dataset (id INTEGER PRIMARY KEY, {columns})")
+        
+        # Add columns introduced after the store was created
+        existing = {row['name'] for row in self._conn.execute('PRAGMA table_info(dataset)')}
+        for name, sql_type in self.COLUMNS.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE dataset ADD COLUMN {name} {sql_type}")
+        for index_name, index_columns in self.INDEXES.items():
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON dataset ({', '.join(index_columns)})")
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+    
+    @classmethod
+    def _convert_value(cls, column: str, value):
+        """Convert a dataset value to its column type, '-' and empty values become NULL"""
+        if value is None:
+            return None
+        if isinstance(value, float) and value != value:
+            return None
+        
+        text = str(value).strip()
+        if text in ('', '-', 'N/A'):
+            return None
+        
+        sql_type = cls.COLUMNS[column]
+        if sql_type == 'TEXT':
+            return str(value)
+        if column in cls._KBPS_COLUMNS and text.lower().endswith('k'):
+            text = text[:-1]
+        
+        try:
+            if '/' in text:
+                numerator, denominator = text.split('/')
+                number = float(numerator) / float(denominator)
+            else:
+                number = float(text)
+        except (ValueError, ZeroDivisionError):
+            logger.warning(f"Invalid value for {column}: {value}")
+            return None
+        
+        return int(number) if sql_type == 'INTEGER' else number
+    
+    @classmethod
+    def typed_row(cls, row: Dict) -> Dict:
+        """Convert a dataset row to typed values for every store column"""
+        return {column: cls._convert_value(column, row.get(column)) for column in cls.COLUMNS}
+    
+    def ingest(self, rows: List[Dict]) -> int:
+        """
+        Append dataset rows to the store
+        Args:
+            rows: List of dataset row dictionaries, as written to dataset.csv
+        Returns:
+            int: Number of ingested rows
+        """
+        if not rows:
+            return 0
+        
+        columns = list(self.COLUMNS)
+        values = [
+            tuple(self._convert_value(column, row.get(column)) for column in columns)
+            for row in rows
+        ]
+        query = f"INSERT INTO dataset ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        
+        with self._conn:
+            self._conn.executemany(query, values)
+        return len(values)
+    
+    @classmethod
+    def from_csv(cls, csv_path: str, db_path: str, chunk_size: int = 50000) -> 'DatasetStore':
+        """
+        Migrate an existing dataset.csv into a new store
+        Args:
+            csv_path: Path to dataset CSV
+            db_path: Path to SQLite database
+            chunk_size: Number of CSV rows ingested per batch
+        Returns:
+            DatasetStore: Store containing the migrated rows
+        """
+        # Build the store next to the target and move it into place once complete,
+        # so an interrupted migration never leaves a partial db_path behind
+        migrating_path = f"{db_path}.migrating"
+        for path in (migrating_path, f"{migrating_path}-wal", f"{migrating_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        
+        store = cls(migrating_path)
+        total = 0
+        try:
+            for chunk in pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=chunk_size):
+                total += store.ingest(chunk.to_dict('records'))
+        finally:
+            store.close()
+        
+        os.replace(migrating_path, db_path)
+        logger.info(f"Migrated {total} rows from {csv_path} to {db_path}")
+        return cls(db_path)
+    
+    def count(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM dataset').fetchone()[0]
+    
+    @staticmethod
+    def _build_filters(source: str = None, codec: str = None, profile: str = None,
+                       height: int = None, min_bitrate: int = None, max_bitrate: int = None,
+                       conditions: List[str] = None, condition_params: List = None) -> tuple:
+        conditions = list(conditions or [])
+        params = list(condition_params or [])
+        for column, value in (('s_name', source), ('e_codec', codec),
+                              ('e_codec_profile', profile), ('e_height', height)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if min_bitrate is not None:
+            conditions.append('e_bitrate >= ?')
+            params.append(min_bitrate)
+        if max_bitrate is not None:
+            conditions.append('e_bitrate <= ?')
+            params.append(max_bitrate)
+        
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
+    
+    def timings(self) -> List[Dict]:
+        """Return job features and stage timings of rows with recorded encode and quality times"""
+        query = ('SELECT s_width, s_height, s_duration, e_width, e_height, e_codec, e_preset, e_bitrate, '
+                 'j_encode_time, j_quality_time FROM dataset '
+                 'WHERE j_encode_time IS NOT NULL AND j_quality_time IS NOT NULL')
+        return [dict(row) for row in self._conn.execute(query)]
+    
+    def lookup(self, source: str = None, codec: str = None, profile: str = None,
+               height: int = None, min_bitrate: int = None, max_bitrate: int = None,
+               limit: int = None) -> List[Dict]:
+        """Return rows matching the given filters, ordered by bitrate (kbps)"""
+        where, params = self._build_filters(source, codec, profile, height, min_bitrate, max_bitrate)
+        query = f"SELECT * FROM dataset{where} ORDER BY e_bitrate"
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [dict(row) for row in self._conn.execute(query, params)]
+    
+    def best_rung(self, source: str, height: int, min_quality: float, metric: str = 't_vmaf',
+                  codec: str = None, profile: str = None) -> Optional[Dict]:
+        """
+        Get the lowest bitrate rung reaching a quality threshold
+        Args:
+            source: Source video name
+            height: Encoded height, e.g. 720
+            min_quality: Minimum metric value, e.g. 90 for VMAF
+            metric: Quality column, one of METRICS
+            codec: Optional codec filter
+            profile: Optional codec profile filter
+        Returns:
+            Dict: Matching row, None if no rung reaches the threshold
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        
+        where, params = self._build_filters(source, codec, profile, height,
+                                            conditions=['e_bitrate IS NOT NULL', f"{metric} >= ?"],
+                                            condition_params=[min_quality])
+        query = f"SELECT * FROM dataset{where} ORDER BY e_bitrate, {metric} DESC LIMIT 1"
+        row = self._conn.execute(query, params).fetchone()
+        return dict(row) if row else None
+    
+    def convex_hull(self, source: str, metric: str = 't_vmaf', codec: str = None,
+                    profile: str = None) -> List[Dict]:
+        """
+        Get the rate-quality convex hull of a source across all resolutions
+        Args:
+            source: Source video name
+            metric: Quality column, one of METRICS
+            codec: Optional codec filter
+            profile: Optional codec profile filter
+        Returns:
+            List[Dict]: Hull rows ordered by increasing bitrate
+        """
+        if metric not in self.METRICS:
+            raise ValueError(f"Unknown metric: {metric}")
+        
+        where, params = self._build_filters(source, codec, profile,
+                                            conditions=['e_bitrate IS NOT NULL', f"{metric} IS NOT NULL"])
+        query = f"SELECT * FROM dataset{where} ORDER BY e_bitrate, {metric} DESC"
+        
+        # Keep only rows improving quality over every cheaper rung (Pareto front)
+        front = []
+        for row in self._conn.execute(query, params):
+            if not front or row[metric] > front[-1][metric]:
+                front.append(dict(row))
+        
+        # Upper convex hull of the front (monotone chain)
+        hull = []
+        for point in front:
+            while len(hull) >= 2:
+                (x1, y1), (x2, y2) = ((p['e_bitrate'], p[metric]) for p in hull[-2:])
+                cross = (x2 - x1) * (point[metric] - y1) - (y2 - y1) * (point['e_bitrate'] - x1)
+                if cross < 0:
+                    break
+                hull.pop()
+            hull.append(point)
+        
+        return hull
+            
+class ResultsSink:
+    """Batch dataset rows and upsert them into a results table from a background thread"""
+    
+    _BIGINT_COLUMNS = ('s_size', 'e_size', 'e_bitrate', 'e_max_bitrate', 'e_buffer_size')
+    
+    def __init__(self, pool, table: str = 'encode_results', batch_size: int = 100,
+                 flush_interval: float = 2.0, max_retries: int = 3, backoff: float = 0.5):
+        """
+        Args:
+            pool: Connection pool exposing get_connection() and dialect ('mysql' or 'sqlite'),
+                e.g. MySqlConnectionPool or SQLiteConnectionPool
+            table: Results table name
+            batch_size: Maximum number of rows written per statement
+            flush_interval: Seconds to wait for a batch to fill before writing it
+            max_retries: Number of write attempts per batch
+            backoff: Initial retry delay in seconds, doubled after each failed attempt
+        """
+        self._pool = pool
+        self._dialect = getattr(pool, 'dialect', 'mysql')
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.failed_rows = 0
+        
+        self._columns = ['job_id'] + list(DatasetStore.COLUMNS)
+        self._query = self._build_upsert_query()
+        self._queue = queue.Queue()
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name='ResultsSink', daemon=True)
+        self._thread.start()
+    
+    def _build_upsert_query(self) -> str:
+        columns = ', '.join(self._columns)
+        if self._dialect == 'sqlite':
+            placeholders = ', '.join('?' * len(self._columns))
+            updates = ', '.join(f"{c} = excluded.{c}" for c in self._columns[1:])
+            return f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders}) ON CONFLICT(job_id) DO UPDATE SET {updates}"
+        
+        placeholders = ', '.join(['%s'] * len(self._columns))
+        updates = ', '.join(f"{c} = VALUES({c})" for c in self._columns[1:])
+        return f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders}) ON DUPLICATE KEY UPDATE {updates}"
+    
+    def _column_type(self, name: str) -> str:
+        # MySQL INTEGER is 32-bit, file sizes above 2 GB need BIGINT
+        if self._dialect == 'mysql' and name in self._BIGINT_COLUMNS:
+            return 'BIGINT'
+        return DatasetStore.COLUMNS[name]
+    
+    def create_table(self) -> bool:
+        """Create the results table if it does not exist"""
+        key_type = 'TEXT' if self._dialect == 'sqlite' else 'VARCHAR(255)'
+        columns = ', '.join(f"{name} {self._column_type(name)}" for name in DatasetStore.COLUMNS)
+        if not self._execute(f"CREATE TABLE IF NOT EXISTS {self.table} (job_id {key_type} PRIMARY KEY, {columns})"):
+            return False
+        
+        # Add columns introduced after the table was created
+        connection = None
+        try:
+            connection = self._pool.get_connection()
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT * FROM {self.table} LIMIT 0")
+            cursor.fetchall()
+            existing = {description[0] for description in cursor.description}
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Error reading columns of {self.table}: {e}")
+            return False
+        finally:
+            if connection:
+                connection.close()
+        
+        for name in DatasetStore.COLUMNS:
+            if name not in existing and not self._execute(f"ALTER TABLE {self.table} ADD COLUMN {name} {self._column_type(name)}"):
+                return False
+        return True
+    
+    def submit(self, job_id: str, row: Dict):
+        """Queue a dataset row, rows with the same job_id overwrite each other"""
+        self._queue.put((job_id, row))
+    
+    def flush(self):
+        """Block until every submitted row has been written or dropped"""
+        self._queue.join()
+    
+    def close(self):
+        """Write remaining rows and stop the background thread"""
+        self._queue.put(self._stop)
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is self._stop:
+                self._queue.task_done()
+                return
+            
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is self._stop:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._write_batch(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+    
+    def _write_batch(self, batch: List[tuple]):
+        # Keep the last row per job so a batch never upserts the same key twice
+        rows = {job_id: row for job_id, row in batch}
+        values = [
+            (job_id,) + tuple(DatasetStore._convert_value(c, row.get(c)) for c in self._columns[1:])
+            for job_id, row in rows.items()
+        ]
+        
+        if self._execute(self._query, values):
+            logger.info(f"Successfully wrote {len(values)} rows to {self.table}")
+            return
+        
+        # Retry row by row so a single bad row does not drop the whole batch
+        failed = 0
+        for value in values:
+            if not self._execute(self._query, [value], max_retries=1):
+                failed += 1
+                logger.error(f"Dropped row {value[0]} for {self.table}")
+        
+        self.failed_rows += failed
+        logger.info(f"Wrote {len(values) - failed} of {len(values)} rows to {self.table} row by row")
+    
+    def _execute(self, query: str, values: List[tuple] = None, max_retries: int = None) -> bool:
+        for attempt in range(max_retries or self.max_retries):
+            connection = None
+            cursor = None
+            try:
+                if attempt > 0:
+                    time.sleep(self.backoff * 2 ** (attempt - 1))
+                
+                connection = self._pool.get_connection()
+                cursor = connection.cursor()
+                if values is None:
+                    cursor.execute(query)
+                else:
+                    cursor.executemany(query, values)
+                connection.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Attempt {attempt + 1} writing to {self.table} failed: {e}")
+            finally:
+                if cursor:
+                    try:
+                        cursor.close()
+                    except Exception:
+                        pass
+                if connection:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+        
+        return False
+            
+class EncodeCostModel:
+    """Predict encode and quality stage run times of a job from historical runs"""
+    
+    STAGES = ('j_encode_time', 'j_quality_time')
+    
+    # Minimum number of runs to fit any model
+    MIN_GROUP_SAMPLES = 10
+    
+    # Used before any history exists: seconds per megapixel-second of video
+    DEFAULT_SECONDS_PER_MPIX = {'j_encode_time': 0.05, 'j_quality_time': 0.02}
+    DEFAULT_CODEC_FACTOR = {'h264': 1.0, 'h265': 4.0}
+    
+    def __init__(self):
+        self._models = {}
+        self._codecs = []
+        self._presets = []
+    
+    @staticmethod
+    def _features(row: Dict) -> Optional[List[float]]:
+        """Feature vector from a typed dataset row, None without a source duration"""
+        duration = row.get('s_duration')
+        if not duration:
+            return None
+        
+        source_mpix = (row.get('s_width') or 0) * (row.get('s_height') or 0) / 1e6
+        encoded_mpix = (row.get('e_width') or 0) * (row.get('e_height') or 0) / 1e6 or source_mpix
+        bitrate_mbps = (row.get('e_bitrate') or 0) / 1000
+        
+        return [encoded_mpix * duration, source_mpix * duration, bitrate_mbps * duration, duration, 1.0]
+    
+    def _global_features(self, row: Dict, features: List[float]) -> List[float]:
+        """Append one-hot codec and preset columns, scaled by encoded megapixel-seconds"""
+        # The first codec and preset are the reference levels, unseen presets are treated like it
+        encoded_mpix_seconds = features[0]
+        return (features
+                + [encoded_mpix_seconds * (row.get('e_codec') == codec) for codec in self._codecs[1:]]
+                + [encoded_mpix_seconds * (row.get('e_preset') == preset) for preset in self._presets[1:]])
+    
+    def _heuristic(self, row: Dict, features: List[float]) -> Dict:
+        factor = self.DEFAULT_CODEC_FACTOR.get(row.get('e_codec'), 1.0)
+        return {
+            'j_encode_time': features[0] * self.DEFAULT_SECONDS_PER_MPIX['j_encode_time'] * factor,
+            'j_quality_time': features[1] * self.DEFAULT_SECONDS_PER_MPIX['j_quality_time']
+        }
+    
+    def fit(self, rows: List[Dict]) -> 'EncodeCostModel':
+        """
+        Fit least squares models per stage, globally and per (codec, preset)
+        Args:
+            rows: Typed dataset rows with stage timings, e.g. DatasetStore.timings()
+        Returns:
+            EncodeCostModel: self
+        """
+        samples = []
+        for row in rows:
+            features = self._features(row)
+            if features is not None:
+                samples.append((row, features, [row[stage] for stage in self.STAGES]))
+        
+        self._models = {}
+        self._codecs = sorted({row.get('e_codec') for row, _, _ in samples if row.get('e_codec')})
+        self._presets = sorted({row.get('e_preset') for row, _, _ in samples if row.get('e_preset')})
+        
+        groups = {}
+        for row, features, targets in samples:
+            groups.setdefault(None, []).append((self._global_features(row, features), targets))
+            groups.setdefault((row.get('e_codec'), row.get('e_preset')), []).append((features, targets))
+        
+        for key, group in groups.items():
+            # Require twice as many runs as features so the fit does not interpolate exactly
+            min_samples = max(2 * len(group[0][0]), self.MIN_GROUP_SAMPLES)
+            if len(group) < min_samples:
+                continue
+            X = np.array([features for features, _ in group])
+            y = np.array([targets for _, targets in group])
+            self._models[key] = np.linalg.lstsq(X, y, rcond=None)[0]
+        
+        logger.info(f"Fitted cost model on {len(samples)} runs, {len(self._models)} models")
+        return self
+    
+    @classmethod
+    def from_store(cls, store: 'DatasetStore') -> 'EncodeCostModel':
+        return cls().fit(store.timings())
+    
+    def predict(self, row: Dict) -> Dict:
+        """
+        Predict stage run times of a job
+        Args:
+            row: Typed dataset row describing the job, without timings
+        Returns:
+            Dict: Predicted seconds per stage in STAGES, from the heuristic where no fit applies
+        """
+        features = self._features(row)
+        if features is None:
+            return {stage: 0.0 for stage in self.STAGES}
+        
+        heuristic = self._heuristic(row, features)
+        
+        coefficients = self._models.get((row.get('e_codec'), row.get('e_preset')))
+        if coefficients is None:
+            # The global model only knows codecs seen in the history
+            coefficients = self._models.get(None)
+            if coefficients is None or row.get('e_codec') not in self._codecs:
+                return heuristic
+            features = self._global_features(row, features)
+        
+        predictions = np.array(features) @ coefficients
+        return {
+            stage: float(value) if value > 0 else heuristic[stage]
+            for stage, value in zip(self.STAGES, predictions)
+        }
+
+
+class JobScheduler:
+    @staticmethod
+    def order(jobs: List[Dict]) -> List[Dict]:
+        """Sort jobs longest-predicted-first, the dispatch order of a shared work queue"""
+        return sorted(jobs, key=lambda j: sum(j['predicted'].values()), reverse=True)
+    
+    @staticmethod
+    def schedule(jobs: List[Dict], workers: int) -> List[List[Dict]]:
+        """
+        Assign jobs to workers longest-predicted-first, each job going to the least loaded worker.
+        Matches workers pulling from order(jobs) when predictions are exact, used for estimates.
+        Args:
+            jobs: Jobs with a 'predicted' dict of stage times
+            workers: Number of parallel workers
+        Returns:
+            List[List[Dict]]: Jobs per worker, in dispatch order
+        """
+        queues = [[] for _ in range(max(workers, 1))]
+        loads = [(0.0, index) for index in range(len(queues))]
+        
+        for job in JobScheduler.order(jobs):
+            load, index = heapq.heappop(loads)
+            queues[index].append(job)
+            heapq.heappush(loads, (load + sum(job['predicted'].values()), index))
+        
+        return queues
+    
+    @staticmethod
+    def summarize(queues: List[List[Dict]]) -> Dict:
+        """Predicted makespan and per-stage totals of a schedule"""
+        stages = EncodeCostModel.STAGES
+        worker_loads = [
+            {stage: sum(job['predicted'][stage] for job in queue) for stage in stages}
+            for queue in queues
+        ]
+        return {
+            'makespan': max((sum(load.values()) for load in worker_loads), default=0.0),
+            'stages': {stage: sum(load[stage] for load in worker_loads) for stage in stages},
+            'workers': worker_loads
+        }
+            
 class FFmpegCommandGenerator:
     @staticmethod
     def _get_resolution_key(resolution: str) -> str:
@@ -232,6 +847,7 @@ class FFmpegCommandGenerator:
                 'e_codec': '-',
                 'e_codec_profile': '-',
                 'e_codec_level': '-',
+                'e_preset': '-',
                 'e_framerate': '-',
                 'e_gop_size': '-',
                 'e_b_frame_int': '-',
@@ -243,7 +859,12 @@ class FFmpegCommandGenerator:
                 'e_buffer_size': '-',
                 'e_size': '-',
                 'e_duration': '-',
-                't_vmaf': '-'
+                't_vmaf': '-',
+                't_psnr': '-',
+                't_ssim': '-',
+                't_ms_ssim': '-',
+                'j_encode_time': '-',
+                'j_quality_time': '-'
             }
             
             # Collecting info from variety source
@@ -343,6 +964,8 @@ class VideoAnalyzer:
                     params['e_codec_profile'] = parts[i+1]
                 elif part == '-level':
                     params['e_codec_level'] = parts[i+1]
+                elif part == '-preset':
+                    params['e_preset'] = parts[i+1]
                 elif part == '-bf':
                     params['e_b_frame_int'] = int(parts[i+1])
                 
@@ -417,6 +1040,9 @@ class VideoAnalyzer:
         return default_info
     
 class VMAFCalculator:
+    # libvmaf features computed next to the VMAF model by default
+    QUALITY_FEATURES = ('psnr', 'float_ssim', 'float_ms_ssim')
+    
     @staticmethod
     def get_video_resolution(video_path: str) -> tuple:
         """Get video resolution using ffprobe"""
@@ -440,24 +1066,53 @@ class VMAFCalculator:
             logger.error(f"Error getting video resolution: {e}")
             return None
 
+    @staticmethod
+    def _build_libvmaf_filter(source_res: tuple, encoded_res: tuple, options: str = '') -> str:
+        """Build libvmaf filter graph, scale encoded video to source resolution if needed"""
+        libvmaf = f"libvmaf=model=version=vmaf_v0.6.1:n_threads=8{options}"
+        if source_res != encoded_res:
+            return f"[1]scale={source_res[0]}:{source_res[1]}[scaled];[0][scaled]{libvmaf}"
+        return libvmaf
+
     @staticmethod
     def calculate_vmaf(source_path: str, encoded_path: str) -> float:
         """Calculate VMAF score between source and encoded video"""
+        return VMAFCalculator.calculate_quality_metrics(source_path, encoded_path, features=())['t_vmaf']
+
+    @staticmethod
+    def calculate_quality_metrics(source_path: str, encoded_path: str, features: tuple = QUALITY_FEATURES) -> Dict:
+        """
+        Calculate VMAF, PSNR, SSIM and MS-SSIM in a single decode pass
+        Args:
+            source_path: Path to source video
+            encoded_path: Path to encoded video
+            features: Extra libvmaf features, empty to compute VMAF only
+        Returns:
+            Dict: Dataset columns t_vmaf, t_psnr (luma), t_ssim, t_ms_ssim, None for missing metrics
+        """
+        metrics = {
+            't_vmaf': None,
+            't_psnr': None,
+            't_ssim': None,
+            't_ms_ssim': None
+        }
+        log_path = None
         try:
-            # Get source and encode video resolution
             source_res = VMAFCalculator.get_video_resolution(source_path)
             encoded_res = VMAFCalculator.get_video_resolution(encoded_path)
             
             if not source_res or not encoded_res:
-                return None
+                return metrics
             
-            # Add filter libvmaf
-            if source_res != encoded_res:
-                filter_complex = f"[1]scale={source_res[0]}:{source_res[1]}[scaled];[0][scaled]libvmaf=model=version=vmaf_v0.6.1:n_threads=8"
-            else:
-                filter_complex = "libvmaf=model=version=vmaf_v0.6.1:n_threads=8"
+            # libvmaf computes the extra features on the same decoded frames, pooled results go to a JSON log
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as log_file:
+                log_path = log_file.name
+            
+            options = f":log_fmt=json:log_path={log_path}"
+            if features:
+                options = f":feature={'|'.join(f'name={name}' for name in features)}{options}"
+            filter_complex = VMAFCalculator._build_libvmaf_filter(source_res, encoded_res, options)
             
-            # Run FFMPEG command with libvmaf
             cmd = [
                 'ffmpeg',
                 '-i', source_path,
@@ -468,16 +1123,28 @@ class VMAFCalculator:
             ]
             
             result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                logger.error(f"Quality metrics calculation failed with error: {result.stderr}")
+                return metrics
             
-            # Get VMAF score
-            vmaf_score = None
-            for line in result.stderr.split('\n'):
-                if 'VMAF score:' in line:
-                    vmaf_score = float(line.split(':')[-1].strip())
-                    break
+            with open(log_path, 'r') as f:
+                pooled = json.load(f).get('pooled_metrics', {})
+            
+            metric_keys = {
+                't_vmaf': 'vmaf',
+                't_psnr': 'psnr_y',
+                't_ssim': 'float_ssim',
+                't_ms_ssim': 'float_ms_ssim'
+            }
+            for column, key in metric_keys.items():
+                if key in pooled:
+                    metrics[column] = float(pooled[key]['mean'])
             
-            return vmaf_score
+            return metrics
             
         except Exception as e:
-            logger.error(f"Error calculating VMAF: {e}")
-            return None
\ No newline at end of file
+            logger.error(f"Error calculating quality metrics: {e}")
+            return metrics
+        finally:
+            if log_path and os.path.exists(log_path):
+                os.remove(log_path)